@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+STARTED = time.time()
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hermes_python.hermes import Hermes
+from hermes_python.ffi.utils import MqttOptions
+import toml
+import traceback
+import intents
+import owmclient
+import prefetch
+from skillconfig import CONFIG_INI, read_configuration_file
+
+WORKERS = 4
+WORKER_QUEUE = 16
+OVERLOAD_ANSWER = "Je suis un peu débordé, redemande-moi dans un instant"
+ERROR_ANSWER = "Il y a un problème avec la récupération des infos météo"
+# Time allowed between the start of the script and the subscription to the intents, in seconds
+STARTUP_BUDGET = 0.5
+
+class IntentDispatcher(object):
+    # Runs the intent callbacks on a bounded pool of threads so that a slow fetch does not
+    # hold the Hermes loop. When workers + queue_size callbacks are already pending, the
+    # session is ended right away with an overload answer.
+    def __init__(self, workers=WORKERS, queue_size=WORKER_QUEUE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="intent")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, hermes, intentMessage, answer_builder):
+        if not self._slots.acquire(blocking=False):
+            hermes.publish_end_session(intentMessage.session_id, OVERLOAD_ANSWER)
+            return
+        try:
+            self._executor.submit(self._run, hermes, intentMessage, answer_builder)
+        except RuntimeError:
+            self._slots.release()
+            raise
+
+    def _run(self, hermes, intentMessage, answer_builder):
+        try:
+            conf = read_configuration_file(CONFIG_INI)
+            intents.handle(hermes, intentMessage, conf, answer_builder)
+        except Exception:
+            # Nobody would see the exception in a worker, log it and still end the session
+            traceback.print_exc()
+            hermes.publish_end_session(intentMessage.session_id, ERROR_ANSWER)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+def intent_callback(dispatcher, answer_builder):
+    # One callback per intent, they all share this process' caches and connections
+    def subscribe_intent_callback(hermes, intentMessage):
+        dispatcher.submit(hermes, intentMessage, answer_builder)
+    return subscribe_intent_callback
+
+
+if __name__ == "__main__":
+    conf = read_configuration_file(CONFIG_INI)
+    prefetch.start(conf)
+    settings = conf.get('global', {})
+    dispatcher = IntentDispatcher(workers=int(settings.get('workers', WORKERS)), queue_size=int(settings.get('worker_queue', WORKER_QUEUE)))
+    f = open("/etc/snips.toml", "rt")
+    config = toml.load(f)
+    mqtt_opts = MqttOptions(username=config["snips-common"]["mqtt_username"], password=config["snips-common"]["mqtt_password"], broker_address=config["snips-common"]["mqtt"])
+    with Hermes(mqtt_options=mqtt_opts) as h:
+        for intent_name, answer_builder in intents.HANDLERS.items():
+            h.subscribe_intent(intent_name, intent_callback(dispatcher, answer_builder))
+        elapsed = time.time() - STARTED
+        print("Subscribed to %d intents in %d ms%s" % (len(intents.HANDLERS), elapsed * 1000, " (over the %d ms budget)" % (STARTUP_BUDGET * 1000) if elapsed > STARTUP_BUDGET else ""))
+        # Load the HTTP stack now that the intents are served, rather than on the first question
+        threading.Thread(target=owmclient.client.warm_up, daemon=True).start()
+        h.start()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Pieces of the spoken answers. The date asked for is classified into a (day, day part) bucket with
+# table lookups and every phrase is built at import for each bucket, so rendering an answer is a
+# few dict lookups and a join whatever the date asked for
+
+import datetime
+from bisect import bisect_right
+from conditioncodes import CONDITION_CODES
+
+# Temperatures are given in Kelvin
+KELVIN = 273.15
+
+# Day names of the answers, datetime.weekday() order. Using the locale would mean a process-wide
+# setlocale on every request and depend on the locale of the device
+DAY_NAMES = ("lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche")
+
+# Days relative to the question
+NOW, TODAY, TOMORROW, LATER = range(4)
+DAY_OFFSETS = {0: TODAY, 1: TOMORROW}
+
+# Day parts. DAY is a whole day: Snips gives 00:00 when only a day is asked, parse_query moves it to noon
+NIGHT, MORNING, DAY, AFTERNOON, EVENING = range(5)
+HOUR_PARTS = (NIGHT,) * 6 + (MORNING,) * 6 + (AFTERNOON,) * 6 + (EVENING,) * 6
+NOON = datetime.time(12, 0, 0)
+
+WHEN = {
+    (TODAY, NIGHT): "Cette nuit",
+    (TODAY, MORNING): "Ce matin",
+    (TODAY, DAY): "Cette après-midi",
+    (TODAY, AFTERNOON): "Cette après-midi",
+    (TODAY, EVENING): "Ce soir",
+    (TOMORROW, NIGHT): "Cette nuit",
+    (TOMORROW, MORNING): "Demain matin",
+    (TOMORROW, DAY): "Demain",
+    (TOMORROW, AFTERNOON): "Demain après-midi",
+    (TOMORROW, EVENING): "Demain soir",
+    (LATER, NIGHT): "{day} matin",
+    (LATER, MORNING): "{day} matin",
+    (LATER, DAY): "{day}",
+    (LATER, AFTERNOON): "{day} après-midi",
+    (LATER, EVENING): "{day} soir",
+}
+
+# Verbs of the answers, (present, future)
+THERE_IS = ("il y a", "il y aura")
+IT_IS = ("il fait", "il fera")
+
+MEAN_TEMPERATURE = ("La température moyenne y est de %s", "La température moyenne y sera de %s")
+TEMPERATURE_RANGE = "La température y sera comprise entre %s et %s, avec une moyenne de %s"
+
+# Wind speeds in m/s splitting the wind phrases
+WIND_LIMITS = (3, 10, 15)
+WIND = ("Il n'y {a} presque pas de vent", "Il y {a} un peu de vent", "Il y {a} pas mal de vent", "Il y {a} beaucoup de vent")
+
+def build_prefixes(verbs):
+    # (day, day part, weekday, verb) -> beginning of the answer telling when the forecast applies
+    prefixes = {}
+    for verb in verbs:
+        prefixes[(NOW, None, None, verb)] = "En ce moment, %s " % verb[0]
+        for (day, part), when in WHEN.items():
+            for weekday, day_name in enumerate(DAY_NAMES):
+                prefixes[(day, part, weekday, verb)] = "%s %s " % (when.format(day=day_name), verb[1])
+    return prefixes
+
+def build_names():
+    # (day, day part, weekday) -> the bucket said in the middle of a sentence, "demain soir"
+    names = {(NOW, None, None): "maintenant"}
+    for (day, part), when in WHEN.items():
+        for weekday, day_name in enumerate(DAY_NAMES):
+            name = when.format(day=day_name)
+            names[(day, part, weekday)] = name[0].lower() + name[1:]
+    return names
+
+PREFIXES = build_prefixes([THERE_IS, IT_IS])
+NAMES = build_names()
+CONDITION_WORDS = {code: condition['snips'][0] for code, condition in CONDITION_CODES.items()}
+WIND_PHRASES = tuple(tuple(". " + phrase.format(a=a) for phrase in WIND) for a in ("a", "aura"))
+
+def moment(startdate, rightnow):
+    # Bucket of the date asked for: (day, day part, weekday), (NOW, None, None) for the current weather
+    if startdate == rightnow:
+        return (NOW, None, None)
+    day = DAY_OFFSETS.get((startdate.date() - rightnow.date()).days, LATER)
+    part = DAY if startdate.time() == NOON else HOUR_PARTS[startdate.hour]
+    return (day, part, startdate.weekday())
+
+def tense(moment):
+    # Index of the verb forms to use: 0 for the present, 1 for the future
+    return 0 if moment[0] == NOW else 1
+
+def prefix(moment, verb):
+    return PREFIXES[moment + (verb,)]
+
+def span_prefix(start, end, verb):
+    # Beginning of the answer about a range of slots, "Entre samedi matin et dimanche soir, il y aura "
+    if NAMES[start] == NAMES[end]:
+        return prefix(start, verb)
+    return "Entre %s et %s, %s " % (NAMES[start], NAMES[end], verb[1])
+
+def conditions(condition_ids):
+    return " et ".join([CONDITION_WORDS[condition_id] for condition_id in condition_ids])
+
+def degrees(temp):
+    return ("%.2f degrés" % (temp - KELVIN)).replace('.', ' virgule ')
+
+def wind(speed, tense):
+    return WIND_PHRASES[tense][bisect_right(WIND_LIMITS, speed)]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Micro benchmarks of the skill's hot paths, run with: python3 bench.py [name ...]
+
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import answers
+import vocabulary
+from cachestore import CacheStore
+from forecast import ForecastSeries, parse_response
+from sharedcache import SharedForecasts
+
+def sample_response(slots=40):
+    # A 5 days/3 hours response with every field OpenWeatherMap sends, most of them unused by the skill
+    start = int(time.time()) // 10800 * 10800
+    return json.dumps({
+        'cod': "200", 'message': 0, 'cnt': slots,
+        'list': [{
+            'dt': start + i * 10800,
+            'main': {'temp': 283.15 + i % 8, 'feels_like': 281.2, 'temp_min': 282.1, 'temp_max': 284.3, 'pressure': 1016, 'sea_level': 1016, 'grnd_level': 1009, 'humidity': 71, 'temp_kf': 0.4},
+            'weather': [{'id': 500, 'main': "Rain", 'description': "light rain", 'icon': "10d"}],
+            'clouds': {'all': 75},
+            'wind': {'speed': 4.1, 'deg': 240, 'gust': 7.3},
+            'visibility': 10000, 'pop': 0.32,
+            'rain': {'3h': 0.42},
+            'sys': {'pod': "d"},
+            'dt_txt': time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + i * 10800)),
+        } for i in range(slots)],
+        'city': {'id': 2988507, 'name': "Paris", 'coord': {'lat': 48.8534, 'lon': 2.3488}, 'country': "FR", 'population': 2138551, 'timezone': 7200, 'sunrise': start, 'sunset': start + 43200},
+    })
+
+def measure(fn, number):
+    # Returns (microseconds per call, peak bytes allocated by one call)
+    fn()
+    start = time.perf_counter()
+    for i in range(number):
+        fn()
+    elapsed = (time.perf_counter() - start) / number * 1e6
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def bench_ingest(number=2000):
+    # Ingest path of the JSON disk cache, full decode of the response then re-encoding of all of it,
+    # against decoding and projecting the used fields into the binary cache payload
+    body = sample_response()
+    results = [
+        ("json.loads + json.dumps", lambda: json.dumps(json.loads(body))),
+        ("parse_response + to_bytes", lambda: parse_response(body).to_bytes()),
+    ]
+    for name, fn in results:
+        elapsed, peak = measure(fn, number)
+        print("ingest  %-28s %8.1f us/fetch %8d bytes peak" % (name, elapsed, peak))
+
+def render_forecast(startdate, rightnow, weather, i):
+    # What forecast_answer does once the forecast slot is selected
+    moment = answers.moment(startdate, rightnow)
+    tense = answers.tense(moment)
+    return ''.join([answers.prefix(moment, answers.THERE_IS), answers.conditions(weather.conditions[i]), ". ",
+                    answers.MEAN_TEMPERATURE[tense] % answers.degrees(weather.temp[i]), answers.wind(weather.wind[i], tense)])
+
+def bench_render(number=20000):
+    # Rendering a forecast answer for dates falling in different day parts, the cost should not depend on it
+    weather = parse_response(sample_response())
+    rightnow = datetime.datetime(2019, 6, 3, 9, 30)
+    dates = [
+        ("now", rightnow),
+        ("this afternoon", rightnow.replace(hour=15)),
+        ("tomorrow morning", rightnow + datetime.timedelta(days=1)),
+        ("tomorrow", rightnow.replace(hour=12, minute=0) + datetime.timedelta(days=1)),
+        ("thursday evening", rightnow.replace(hour=21) + datetime.timedelta(days=3)),
+    ]
+    for name, startdate in dates:
+        elapsed, peak = measure(lambda: render_forecast(startdate, rightnow, weather, 3), number)
+        print("render  %-28s %8.1f us/answer %7d bytes peak" % (name, elapsed, peak))
+
+def aggregate(weather, i, j):
+    # What the answers read from the slots of an interval
+    index = weather.index
+    return (index.min_temp(i, j), index.max_temp(i, j), index.mean_temp(i, j), index.max_wind(i, j),
+            index.has_condition(i, j, vocabulary.RAIN_CODES))
+
+def bench_aggregate(number=20000):
+    # Aggregating a single slot, a weekend and the whole forecast, the cost should not depend on the length.
+    # The index is built once per forecast, on first use
+    body = sample_response()
+    weather = parse_response(body)
+    elapsed, peak = measure(lambda: parse_response(body).index, 500)
+    print("agg     %-28s %8.1f us/forecast %5d bytes peak" % ("parse + build index", elapsed, peak))
+    for name, i, j in (("1 slot", 3, 4), ("16 slots", 8, 24), ("40 slots", 0, 40)):
+        elapsed, peak = measure(lambda: aggregate(weather, i, j), number)
+        print("agg     %-28s %8.1f us/query %8d bytes peak" % (name, elapsed, peak))
+
+def bench_lookup(number=5000):
+    # Reading a forecast another process fetched: from the shared memory entries against the SQLite cache
+    payload = parse_response(sample_response()).to_bytes()
+    with tempfile.TemporaryDirectory() as directory:
+        store = CacheStore(os.path.join(directory, "forecasts.sqlite"))
+        shared = SharedForecasts(os.path.join(directory, "forecasts.shm"))
+        store.put("paris_fr", 0, 0, payload)
+        shared.put("paris_fr", 0, 0, payload)
+        for name, cache in (("sqlite get + decode", store), ("shared memory get + decode", shared)):
+            elapsed, peak = measure(lambda: ForecastSeries.from_buffer(cache.get("paris_fr")[2]), number)
+            print("lookup  %-28s %8.1f us/lookup %7d bytes peak" % (name, elapsed, peak))
+        store.close()
+        shared.close()
+
+DAEMON = "action-snips-weather-Kilawyn.Météo.py"
+STARTUP_CODE = """
+import importlib.util, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("daemon", %r)
+daemon = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(daemon)
+print(time.perf_counter() - started, daemon.STARTUP_BUDGET)
+"""
+
+def bench_startup(number=5):
+    # Time to import the daemon and everything it needs before subscribing, in a fresh interpreter
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), DAEMON)
+    timings = []
+    for i in range(number):
+        output = subprocess.check_output([sys.executable, "-c", STARTUP_CODE % path], cwd=os.path.dirname(path))
+        elapsed, budget = [float(value) for value in output.split()]
+        timings.append(elapsed)
+    elapsed = min(timings)
+    print("startup %-28s %8.1f ms          budget %d ms%s" % ("import daemon", elapsed * 1000, budget * 1000, "" if elapsed <= budget else " EXCEEDED"))
+
+BENCHMARKS = {
+    'aggregate': bench_aggregate,
+    'ingest': bench_ingest,
+    'lookup': bench_lookup,
+    'render': bench_render,
+    'startup': bench_startup,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
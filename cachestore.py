@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+CACHE_DIR = "cache"
+CACHE_DB = os.path.join(CACHE_DIR, "forecasts.sqlite")
+# Fetch locks are striped over a fixed set of files so that their number does not grow with the cache
+LOCK_STRIPES = 32
+# Bump this when the table layout changes, the old cache is simply dropped
+SCHEMA_VERSION = 6
+# Budget of the compressed forecast payloads, the least recently used ones are dropped beyond it. 0 for no limit
+MAX_BYTES = 1024 * 1024
+COMPRESSION_LEVEL = 6
+# Reads record their time at most this often per entry, not to turn every lookup into a write
+ACCESS_RESOLUTION = 60
+
+class CacheStore(object):
+    # Forecast cache indexed by location key, stored in a single SQLite file along with the
+    # OpenWeatherMap city each location resolved to. Lookups and writes only touch the row
+    # of the asked location, stale rows are removed by a separate eviction pass.
+    # Payloads are stored zlib compressed and their total size is kept within max_bytes.
+    def __init__(self, path=CACHE_DB, max_bytes=MAX_BYTES, compression_level=COMPRESSION_LEVEL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self.evicted = 0
+        # Last access time recorded for each key by this process, see touch()
+        self._touched = {}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def configure(self, conf):
+        # conf is the [global] section of config.ini, missing values keep their defaults
+        self.max_bytes = int(float(conf.get('cache_max_kb', self.max_bytes / 1024)) * 1024)
+        self.compression_level = int(conf.get('cache_compression_level', self.compression_level))
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            # WAL lets the other skill processes read while a row is written, they only ever see committed rows
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS forecasts")
+                conn.execute("DROP TABLE IF EXISTS locations")
+                conn.execute("DROP TABLE IF EXISTS forecasts_totals")
+                # Pages freed by evictions are given back to the file system instead of growing the file
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+            # size is the length of the compressed payload, raw_size the one it decompresses to
+            conn.execute("CREATE TABLE IF NOT EXISTS forecasts (key TEXT PRIMARY KEY, fetched REAL NOT NULL, expires REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL, raw_size INTEGER NOT NULL, payload BLOB NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS forecasts_expires ON forecasts (expires)")
+            conn.execute("CREATE INDEX IF NOT EXISTS forecasts_last_access ON forecasts (last_access)")
+            # Running totals of the forecasts table, kept by triggers in the transaction changing the rows
+            # so that neither the budget check nor the stats scan the table
+            conn.execute("CREATE TABLE IF NOT EXISTS forecasts_totals (id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, size INTEGER NOT NULL, raw_size INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO forecasts_totals (id, entries, size, raw_size) VALUES (0, 0, 0, 0)")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS forecasts_insert AFTER INSERT ON forecasts BEGIN "
+                         "UPDATE forecasts_totals SET entries = entries + 1, size = size + NEW.size, raw_size = raw_size + NEW.raw_size; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS forecasts_update AFTER UPDATE OF size, raw_size ON forecasts BEGIN "
+                         "UPDATE forecasts_totals SET size = size + NEW.size - OLD.size, raw_size = raw_size + NEW.raw_size - OLD.raw_size; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS forecasts_delete AFTER DELETE ON forecasts BEGIN "
+                         "UPDATE forecasts_totals SET entries = entries - 1, size = size - OLD.size, raw_size = raw_size - OLD.raw_size; END")
+            # A NULL city_id records a location OpenWeatherMap does not know
+            conn.execute("CREATE TABLE IF NOT EXISTS locations (key TEXT PRIMARY KEY, city_id INTEGER, lat REAL, lon REAL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS locations_expires ON locations (expires)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        # Returns (fetched timestamp, expiry timestamp, payload) or None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT fetched, expires, last_access, payload FROM forecasts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            fetched, expires, last_access, payload = row
+            self._touch(conn, key, last_access)
+        return fetched, expires, zlib.decompress(payload)
+
+    def touch(self, key):
+        # Records a read of key served from another cache layer (memory, shared memory) so that
+        # the least recently used eviction sees it too
+        if time.time() - self._touched.get(key, 0) < ACCESS_RESOLUTION:
+            return
+        with self._lock:
+            self._touch(self._connect(), key, self._touched.get(key, 0))
+
+    def _touch(self, conn, key, last_access):
+        # Reads record their time at most every ACCESS_RESOLUTION seconds per key
+        now = time.time()
+        if now - max(last_access, self._touched.get(key, 0)) >= ACCESS_RESOLUTION:
+            with conn:
+                conn.execute("UPDATE forecasts SET last_access = ? WHERE key = ?", (now, key))
+            self._touched[key] = now
+
+    def put(self, key, fetched, expires, payload):
+        data = zlib.compress(payload, self.compression_level)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # Not INSERT OR REPLACE: the rows it replaces don't fire the delete trigger. Not an upsert
+                # either, ON CONFLICT DO UPDATE needs SQLite 3.24 and Raspbian Stretch ships 3.16
+                now = time.time()
+                updated = conn.execute("UPDATE forecasts SET fetched = ?, expires = ?, last_access = ?, size = ?, raw_size = ?, payload = ? WHERE key = ?",
+                                       (fetched, expires, now, len(data), len(payload), data, key))
+                if updated.rowcount == 0:
+                    conn.execute("INSERT INTO forecasts (key, fetched, expires, last_access, size, raw_size, payload) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (key, fetched, expires, now, len(data), len(payload), data))
+                evicted = self._enforce_budget(conn)
+            self._touched[key] = time.time()
+            if evicted > 0:
+                self._vacuum(conn)
+
+    def _enforce_budget(self, conn):
+        # Drops the least recently used forecasts until the payloads fit in max_bytes, returns how many were dropped
+        if self.max_bytes <= 0:
+            return 0
+        excess = conn.execute("SELECT size FROM forecasts_totals").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM forecasts ORDER BY last_access"):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        conn.executemany("DELETE FROM forecasts WHERE key = ?", victims)
+        for key, in victims:
+            self._touched.pop(key, None)
+        self.evicted += len(victims)
+        return len(victims)
+
+    def _vacuum(self, conn):
+        # Gives the free pages back to the file system. Run through executescript: sqlite3 steps a
+        # statement without result columns only once, which would free a single page
+        conn.executescript("PRAGMA incremental_vacuum;")
+
+    def stats(self):
+        # Number of forecasts, bytes of their compressed payloads, bytes they decompress to and the resulting
+        # ratio, size of the database files and forecasts dropped for the budget by this process
+        with self._lock:
+            entries, size, raw_size = self._connect().execute("SELECT entries, size, raw_size FROM forecasts_totals").fetchone()
+        file_size = 0
+        for path in (self.path, self.path + "-wal"):
+            if os.path.exists(path):
+                file_size += os.path.getsize(path)
+        return {
+            'entries': entries,
+            'bytes': size,
+            'raw_bytes': raw_size,
+            'compression_ratio': raw_size / size if size > 0 else 1.0,
+            'file_bytes': file_size,
+            'evicted': self.evicted,
+        }
+
+    def get_location(self, key):
+        # Returns (city id or None if unknown, latitude, longitude, expiry timestamp) or None if not resolved yet
+        with self._lock:
+            row = self._connect().execute("SELECT city_id, lat, lon, expires FROM locations WHERE key = ?", (key,)).fetchone()
+        return row
+
+    def put_location(self, key, city_id, lat, lon, expires):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO locations (key, city_id, lat, lon, expires) VALUES (?, ?, ?, ?, ?)", (key, city_id, lat, lon, expires))
+
+    def delete_location(self, key):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM locations WHERE key = ?", (key,))
+
+    def evict(self, older_than):
+        # Removes every forecast expired before the given timestamp, returns how many were dropped.
+        # Locations are resolved again once expired, they are dropped without grace
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute("DELETE FROM forecasts WHERE expires < ?", (older_than,))
+                conn.execute("DELETE FROM locations WHERE expires < ?", (time.time(),))
+            if cursor.rowcount > 0:
+                self._touched.clear()
+                self._vacuum(conn)
+        return cursor.rowcount
+
+    @contextmanager
+    def fetch_lock(self, key):
+        # Advisory lock shared by every process using the cache: the holder fetches the
+        # location, the others block until it is done and then find its row in the store
+        lock_dir = os.path.join(os.path.dirname(self.path), "locks")
+        if not os.path.isdir(lock_dir):
+            os.makedirs(lock_dir, exist_ok=True)
+        path = os.path.join(lock_dir, "%02d.lock" % (zlib.crc32(key.encode('utf-8')) % LOCK_STRIPES))
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,2 @@
+# The tests import the skill modules from the repository root: pytest.ini makes this directory the
+# rootdir, and pytest puts the directory of this conftest.py on sys.path however it is invoked
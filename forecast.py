@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import json
+import operator
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Length of a forecast slot of the 5 days/3 hours API, in seconds
+SLOT_LENGTH = 10800
+
+# Binary layout, little endian: a header (magic, version, cod, slot count, condition ids per slot)
+# followed by the dt (int64), temp (float64), wind (float64) and condition id (uint16, 0 padded) columns
+BINARY_MAGIC = b'OWMF'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHHH')
+
+class ConditionColumn(object):
+    # Condition ids of every slot, stored flat with `width` ids per slot and 0 as padding
+    __slots__ = ('ids', 'width', 'count')
+
+    def __init__(self, ids, width, count):
+        self.ids = ids
+        self.width = width
+        self.count = count
+
+    @classmethod
+    def from_lists(cls, lists):
+        lists = [list(ids) for ids in lists]
+        width = max([len(ids) for ids in lists] + [0])
+        ids = array('H')
+        for slot_ids in lists:
+            ids.extend(slot_ids + [0] * (width - len(slot_ids)))
+        return cls(ids, width, len(lists))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if i < 0 or i >= self.count:
+            raise IndexError(i)
+        return tuple(condition_id for condition_id in self.ids[i * self.width:(i + 1) * self.width] if condition_id != 0)
+
+def sparse_table(values, combine):
+    # levels[k][i] = combine of values[i:i + 2**k], any range is then covered by two overlapping entries
+    levels = [list(values)]
+    width = 1
+    while width * 2 <= len(values):
+        previous = levels[-1]
+        levels.append([combine(previous[i], previous[i + width]) for i in range(len(previous) - width)])
+        width *= 2
+    return levels
+
+def query_sparse_table(levels, combine, i, j):
+    # combine of values[i:j], j > i
+    k = (j - i).bit_length() - 1
+    return combine(levels[k][i], levels[k][j - (1 << k)])
+
+class SlotIndex(object):
+    # Aggregates of any range of slots in constant time: prefix sums of the temperatures and sparse
+    # tables of the temperature min/max, of the wind max and of the conditions, as bitmasks of the
+    # condition ids present in the forecast. Ranges are [i, j) slot indexes with j > i
+    __slots__ = ('temp_sums', 'min_temps', 'max_temps', 'max_winds', 'condition_bits', 'condition_masks')
+
+    def __init__(self, series):
+        self.temp_sums = array('d', [0.0])
+        for temp in series.temp:
+            self.temp_sums.append(self.temp_sums[-1] + temp)
+        self.min_temps = sparse_table(series.temp, min)
+        self.max_temps = sparse_table(series.temp, max)
+        self.max_winds = sparse_table(series.wind, max)
+        slot_conditions = [series.conditions[i] for i in range(len(series))]
+        codes = sorted(set(condition_id for conditions in slot_conditions for condition_id in conditions))
+        self.condition_bits = {code: 1 << bit for bit, code in enumerate(codes)}
+        masks = []
+        for conditions in slot_conditions:
+            mask = 0
+            for condition_id in conditions:
+                mask |= self.condition_bits[condition_id]
+            masks.append(mask)
+        self.condition_masks = sparse_table(masks, operator.or_)
+
+    def mean_temp(self, i, j):
+        return (self.temp_sums[j] - self.temp_sums[i]) / (j - i)
+
+    def min_temp(self, i, j):
+        return query_sparse_table(self.min_temps, min, i, j)
+
+    def max_temp(self, i, j):
+        return query_sparse_table(self.max_temps, max, i, j)
+
+    def max_wind(self, i, j):
+        return query_sparse_table(self.max_winds, max, i, j)
+
+    def conditions(self, i, j):
+        # Condition ids found in at least one slot of the range, in increasing order
+        mask = query_sparse_table(self.condition_masks, operator.or_, i, j)
+        return [code for code, bit in self.condition_bits.items() if mask & bit]
+
+    def has_condition(self, i, j, codes):
+        # Whether a slot of the range has one of the condition ids of codes
+        mask = 0
+        for code in codes:
+            mask |= self.condition_bits.get(code, 0)
+        return mask != 0 and query_sparse_table(self.condition_masks, operator.or_, i, j) & mask != 0
+
+class ForecastSeries(object):
+    # The part of an OpenWeatherMap forecast the intents use, as parallel columns:
+    # slot start timestamps, temperatures (Kelvin), wind speeds (m/s) and condition ids.
+    # city is the (city id, latitude, longitude) of a parsed response, it is not part of the cached payload
+    __slots__ = ('cod', 'dt', 'temp', 'wind', 'conditions', 'city', '_index')
+
+    def __init__(self, cod, dt=(), temp=(), wind=(), conditions=(), city=None):
+        self.cod = cod
+        self.city = city
+        self.dt = array('q', dt)
+        self.temp = array('d', temp)
+        self.wind = array('d', wind)
+        self.conditions = ConditionColumn.from_lists(conditions)
+        self._index = None
+
+    def to_bytes(self):
+        columns = [self.dt, self.temp, self.wind, self.conditions.ids]
+        if sys.byteorder == 'big':
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        cod = int(self.cod) if self.cod.isdigit() else 0
+        return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, cod, len(self), self.conditions.width) + b''.join(column.tobytes() for column in columns)
+
+    @classmethod
+    def from_buffer(cls, buf):
+        # Reads the columns straight out of a bytes-like object written by to_bytes, without any parsing.
+        # Returns None if the buffer is not in a layout this version understands
+        buf = memoryview(buf)
+        if len(buf) < BINARY_HEADER.size:
+            return None
+        magic, version, cod, count, width = BINARY_HEADER.unpack_from(buf)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            return None
+        if len(buf) != BINARY_HEADER.size + count * (8 + 8 + 8 + 2 * width):
+            return None
+        series = cls.__new__(cls)
+        series.cod = str(cod)
+        series.city = None
+        offset = BINARY_HEADER.size
+        columns = []
+        for typecode, length in (('q', count), ('d', count), ('d', count), ('H', count * width)):
+            column = array(typecode)
+            column.frombytes(buf[offset:offset + length * column.itemsize])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            offset += length * column.itemsize
+        series.dt, series.temp, series.wind, conditions = columns
+        series.conditions = ConditionColumn(conditions, width, count)
+        series._index = None
+        return series
+
+    def __len__(self):
+        return len(self.dt)
+
+    def slot_index(self, timestamp):
+        # Index of the slot strictly containing timestamp, None if it is before or beyond the forecast
+        i = bisect_left(self.dt, timestamp) - 1
+        if i >= 0 and timestamp < self.dt[i] + SLOT_LENGTH:
+            return i
+        return None
+
+    def slot_range(self, start, end=None):
+        # (i, j) such that the slots [i, j) overlap the [start, end) time range, end None meaning
+        # the end of the forecast. i == j when none does
+        i = bisect_right(self.dt, start - SLOT_LENGTH)
+        j = len(self) if end is None else max(i, bisect_left(self.dt, end))
+        return i, j
+
+    @property
+    def index(self):
+        # Built on first use, once per forecast as the series are kept in the caches
+        if self._index is None:
+            self._index = SlotIndex(self)
+        return self._index
+
+def city_of(city):
+    # (city id, latitude, longitude) of the "city" object of a response, None if it has no id
+    if not isinstance(city, dict) or not isinstance(city.get('id'), int):
+        return None
+    coord = city.get('coord') or {}
+    return (city['id'], coord.get('lat'), coord.get('lon'))
+
+def parse_response(text):
+    # Decodes an API response into a ForecastSeries keeping only the fields the intents use, slots
+    # sorted by start time. Raises ValueError, KeyError or TypeError on malformed documents
+    weather = json.loads(text)
+    if not isinstance(weather, dict):
+        raise ValueError("the response is not a JSON object")
+    slots = sorted(weather.get('list', []), key=lambda forecast: forecast['dt'])
+    return ForecastSeries(str(weather.get('cod')),
+                          [forecast['dt'] for forecast in slots],
+                          [forecast['main']['temp'] for forecast in slots],
+                          [forecast.get('wind', {}).get('speed', 0.0) for forecast in slots],
+                          [[w['id'] for w in forecast.get('weather', [])] for forecast in slots],
+                          city_of(weather.get('city')))
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import random
+import re
+from hermes_python.ontology.dialogue.slot import InstantTimeValue, TimeIntervalValue
+import weather as wt
+import answers
+from answers import KELVIN
+from forecast import SLOT_LENGTH
+from locations import find_country, normalize_text
+import vocabulary as vocab
+
+_TIMEZONE_COLON = re.compile(r'^([0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2} \+[0-9]{2}):([0-9]{2})$')
+
+def slot_value(intentMessage, name):
+    if len(intentMessage.slots[name]) > 0:
+        return intentMessage.slots[name].first().value
+    return None
+
+def parse_date(value):
+    return datetime.datetime.strptime(_TIMEZONE_COLON.sub(r'\1\2', value), '%Y-%m-%d %H:%M:%S %z')
+
+def parse_query(intentMessage, conf):
+    # Slots shared by every weather intent: where and when the forecast is asked for
+    query = {
+        'locality': conf['secret']['default_location'],
+        'country': conf['secret']['default_countrycode'],
+        'capital': None,
+        'geographical_poi': slot_value(intentMessage, 'forecast_geographical_poi'),
+        'region': slot_value(intentMessage, 'forecast_region'),
+    }
+    startdate = datetime.datetime.now()
+    rightnow = startdate
+    interval = None
+    if len(intentMessage.slots['forecast_start_datetime']) > 0:
+        # This one is tricky, regarding the question it may be an InstantTimeValue or a TimeIntervalValue
+        # In the last case the whole interval is kept to aggregate its slots, the start hour plus one hour
+        # (to make a difference with 00:00, see below how this is handled) tells how to introduce the answer
+        startdate = intentMessage.slots['forecast_start_datetime'].first()
+        is_interval = False
+        if isinstance(startdate, InstantTimeValue):
+            startdate = startdate.value
+        elif isinstance(startdate, TimeIntervalValue):
+            enddate = startdate.to_date
+            startdate = startdate.from_date
+            is_interval = True
+        startdate = parse_date(startdate)
+        rightnow = datetime.datetime.now(startdate.tzinfo)
+        if is_interval:
+            # An interval without end ("à partir de demain") goes to the end of the forecast
+            interval = (startdate, parse_date(enddate) if enddate is not None else None)
+            startdate += datetime.timedelta(hours=+1)
+        # If only a day is asked, Snips will provide a time of 00:00:00 which is not interesting for weather.
+        # So I offset that by 12 hours
+        if startdate.time() == datetime.time(00, 00, 00):
+            startdate += datetime.timedelta(hours=12)
+    query['startdate'] = startdate
+    query['rightnow'] = rightnow
+    query['interval'] = interval
+    query['moment'] = answers.moment(startdate, rightnow)
+    query['end_moment'] = None
+    if len(intentMessage.slots['forecast_country']) > 0:
+        # OpenWeatherMap requests 2-letters ISO-3166 country codes. This is for the mapping fr->ISO-3166
+        country = intentMessage.slots['forecast_country'].first().value
+        query['country'] = country
+        found = find_country(country)
+        if found is not None:
+            query['country'], query['capital'] = found
+    if len(intentMessage.slots['forecast_locality']) > 0:
+        query['locality'] = intentMessage.slots['forecast_locality'].first().value
+    return query
+
+def fetch_forecast(query, conf):
+    # Resolves the location, fetches its forecast and selects the slots matching the asked date, a single
+    # one for a date and every slot overlapping an interval. Returns (weather, range of the slot indexes, None)
+    # or (None, None, answer) when the question can't be answered
+    if query['geographical_poi'] is not None:
+        return None, None, "Désolé, je ne suis pas encore capable de récupérer un point d'intérêt"
+    elif query['region'] is not None:
+        return None, None, "Je ne peux pas encore te donner la météo d'une région"
+    elif query['country'] != conf['secret']['default_countrycode'] and query['locality'] == conf['secret']['default_location']:
+        if query['capital'] is None:
+            return None, None, "J'ai besoin d'une ville dans le pays dont tu souhaites la météo"
+        else:
+            query['locality'] = query['capital']
+
+    weather = wt.get_weather_data(query['locality'], query['country'], conf['secret']['api_key'])
+
+    if weather is None or weather.cod != "200" and weather.cod != "404":
+        return None, None, "Il y a un problème avec la récupération des infos météo"
+    elif weather.cod == "404":
+        return None, None, "Je n'ai pas trouvé la ville que tu as demandé"
+
+    if query['interval'] is not None:
+        start, end = query['interval']
+        first, last = weather.slot_range(start.timestamp(), None if end is None else end.timestamp())
+        if first == last:
+            return None, None, "Il semblerait que la date que tu m'as demandée ne permette pas de récupérer d'info."
+        since = max(start.timestamp(), weather.dt[first], query['rightnow'].timestamp())
+        if since > start.timestamp():
+            # The interval started already, the answer starts at the slots actually aggregated
+            since = datetime.datetime.fromtimestamp(since, start.tzinfo) + datetime.timedelta(hours=+1)
+            query['moment'] = answers.moment(since, query['rightnow'])
+        if last - first > 1:
+            # The answer tells the span of the slots actually aggregated
+            until = weather.dt[last - 1] + SLOT_LENGTH
+            if end is not None:
+                until = min(until, end.timestamp())
+            until = datetime.datetime.fromtimestamp(until - 1, start.tzinfo)
+            query['end_moment'] = answers.moment(until, query['rightnow'])
+        return weather, range(first, last), None
+
+    startdate = query['startdate']
+    rightnow = query['rightnow']
+    selected_forecast = None
+    if startdate == rightnow or startdate - datetime.timedelta(hours=3) < rightnow:
+        # We have to take in account that the next forecast is already in the future (3h in the worst case scenario)
+        if len(weather) > 0:
+            selected_forecast = 0
+    else:
+        selected_forecast = weather.slot_index(startdate.timestamp())
+    if selected_forecast is None: # Nope, the date given is beyond the forecast or on a past value
+        return None, None, "Il semblerait que la date que tu m'as demandée ne permette pas de récupérer d'info."
+    return weather, range(selected_forecast, selected_forecast + 1), None
+
+def when_prefix(query, verb):
+    if query['end_moment'] is None:
+        return answers.prefix(query['moment'], verb)
+    return answers.span_prefix(query['moment'], query['end_moment'], verb)
+
+def slot_conditions(weather, slots):
+    # Conditions of a single slot in the order of the API, the ones found over the slots otherwise
+    if len(slots) == 1:
+        return weather.conditions[slots.start]
+    return weather.index.conditions(slots.start, slots.stop)
+
+def forecast_answer(intentMessage, query, weather, slots, conf):
+    tense = answers.tense(query['moment'])
+    answer = [when_prefix(query, answers.THERE_IS), answers.conditions(slot_conditions(weather, slots)), ". "]
+    if query['locality'] != conf['secret']['default_location']:
+        answer.append("à %s. " % query['locality'])
+    if len(slots) == 1:
+        answer.append(answers.MEAN_TEMPERATURE[tense] % answers.degrees(weather.temp[slots.start]))
+    else:
+        index = weather.index
+        answer.append(answers.TEMPERATURE_RANGE % (answers.degrees(index.min_temp(slots.start, slots.stop)),
+                                                   answers.degrees(index.max_temp(slots.start, slots.stop)),
+                                                   answers.degrees(index.mean_temp(slots.start, slots.stop))))
+    answer.append(answers.wind(weather.index.max_wind(slots.start, slots.stop), tense))
+    return ''.join(answer)
+
+def condition_answer(intentMessage, query, weather, slots, conf):
+    asked_codes = vocab.condition_codes(slot_value(intentMessage, 'forecast_condition_name'))
+    non_array = [
+            "Non. ",
+            "Pas vraiment. ",
+            "Il semblerait que non. ",
+    ]
+    oui_array = [
+            "Oui. ",
+            "En effet, ",
+            "Effectivement, ",
+    ]
+    if weather.index.has_condition(slots.start, slots.stop, asked_codes):
+        oui = random.choice(oui_array)
+    else:
+        oui = random.choice(non_array)
+    answer = [oui, when_prefix(query, answers.THERE_IS), answers.conditions(slot_conditions(weather, slots)), " "]
+    if query['locality'] != conf['secret']['default_location']:
+        answer.append("à %s" % query['locality'])
+    return ''.join(answer)
+
+def item_answer(intentMessage, query, weather, slots, conf):
+    item = slot_value(intentMessage, 'forecast_item')
+    kind = vocab.item_kind(item)
+    index = weather.index
+    i, j = slots.start, slots.stop
+    answer = ""
+
+    if kind == vocab.SUN_GEAR or kind == vocab.SUMMER_CLOTHES:
+        if index.has_condition(i, j, vocab.SUNNY_CODES):
+            answer += "ça peut être utile, du soleil est prévu"
+        elif kind == vocab.SUMMER_CLOTHES:
+            if index.max_temp(i, j) - KELVIN > 25:
+                answer += "Il va faire chaud, ça peut être utile"
+            else:
+                answer += "La température ne va pas non plus être étouffante, à toi de voir"
+        else:
+            answer += "Il semblerait que ce ne soit pas de première nécessité"
+    elif kind == vocab.COLD_GEAR:
+        temp = index.min_temp(i, j) - KELVIN
+        if temp < 8:
+            answer += "Les températures promettent d'être basses, mieux vaut être prévoyant"
+        elif temp >= 8 and temp < 12:
+            answer += "Il ne va pas faire affreusement froid mais sait-on jamais"
+        else:
+            answer += "Tout l'attirail anti froid ne semble pas nécessaire"
+    elif kind == vocab.RAIN_GEAR:
+        if index.has_condition(i, j, vocab.RAIN_CODES):
+            answer += "Il risque d'y avoir de la pluie, ça peut être intéressant de prendre ça avec"
+        elif index.has_condition(i, j, vocab.THUNDERSTORM_CODES):
+            if normalize_text(item) != "parapluie":
+                answer += "Attention, de l'orage est prévu. Prends de quoi te couvrir"
+            else:
+                answer += "Un parapluie dans un orage, c'est pas vraiment conseillé"
+        else:
+            answer += "À priori non, pas de mauvais temps prévu"
+    else:
+        answer += "Je ne vois pas de quoi tu veux parler"
+    return answer
+
+def temperature_answer(intentMessage, query, weather, slots, conf):
+    kind = vocab.temperature_kind(slot_value(intentMessage, 'forecast_temperature_name'))
+    index = weather.index
+    i, j = slots.start, slots.stop
+    answer = when_prefix(query, answers.IT_IS)
+
+    if query['locality'] != conf['secret']['default_location']:
+        answer += "à %s. " % query['locality']
+
+    if len(slots) == 1:
+        answer += answers.degrees(weather.temp[i])
+    else:
+        answer += "entre %s et %s" % (answers.degrees(index.min_temp(i, j)), answers.degrees(index.max_temp(i, j)))
+    if kind is not None:
+        # How the temperature asked for compares to the current one, or to the same time tomorrow
+        # for the current weather
+        if i == 0 and j == 1:
+            tempDelta = weather.temp[min(8, len(weather) - 1)] - weather.temp[0] # 8*3h = 24h
+        else:
+            tempDelta = index.mean_temp(i, j) - weather.temp[0]
+        if kind == vocab.COLDER:
+            if tempDelta < 0 and tempDelta > -5:
+                answer += "Donc oui, il fera un peu plus frais"
+            elif tempDelta < -5:
+                answer += "Donc oui, il fera vraiment plus frais"
+            else:
+                answer += "Donc non, le temps va se réchauffer"
+        elif kind == vocab.WARMER:
+            if tempDelta > 0 and tempDelta < 5:
+                answer += "Donc oui, il fera un peu plus chaud"
+            elif tempDelta > 5:
+                answer += "Donc oui, il fera vraiment plus chaud"
+            else:
+                answer += "Donc non, le temps va se rafraîchir"
+        elif kind == vocab.HOT:
+            if index.max_temp(i, j) - KELVIN > 28:
+                answer += "En effet, le climat s'annonce estival"
+            else:
+                answer += "ça devrait aller"
+        elif kind == vocab.COLD:
+            if index.min_temp(i, j) - KELVIN < 10:
+                answer += "En effet, la météo s'annonce bien fraîche"
+            else:
+                answer += "ça devrait aller"
+    return answer
+
+# Intent name -> function building the answer once the forecast is known
+HANDLERS = {
+    "searchWeatherForecast": forecast_answer,
+    "searchWeatherForecastCondition": condition_answer,
+    "searchWeatherForecastItem": item_answer,
+    "searchWeatherForecastTemperature": temperature_answer,
+}
+
+_applied_conf = None
+
+def handle(hermes, intentMessage, conf, answer_builder):
+    global _applied_conf
+    if conf is not _applied_conf:
+        # The configuration is cached until config.ini changes, only apply it again then
+        wt.configure(conf)
+        _applied_conf = conf
+    query = parse_query(intentMessage, conf)
+    weather, slots, answer = fetch_forecast(query, conf)
+    if answer is None:
+        answer = answer_builder(intentMessage, query, weather, slots, conf)
+    hermes.publish_end_session(intentMessage.session_id, answer)
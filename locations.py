@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import unicodedata
+from urllib.parse import quote
+
+_SEPARATORS = re.compile(r"[\s\-_'’,.]+")
+
+def normalize_text(text):
+    # Case folding, accent stripping and whitespace/punctuation collapsing: "  Saint-Étienne " -> "saint etienne"
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _SEPARATORS.sub(' ', text.casefold()).strip()
+
+def location_key(locality, country):
+    # Canonical cache key of a location, safe to use in a file name
+    return "%s_%s" % (quote(normalize_text(locality).replace(' ', '-'), safe='-'), quote(normalize_text(country), safe=''))
+
+COUNTRIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iso_3166.csv")
+# Leading words dropped from country names: "la France", "les États-Unis", "l'Italie", "du Japon"...
+_ARTICLES = {"la", "le", "les", "l", "du", "de", "des", "d", "en", "au", "aux"}
+
+def country_name_key(name):
+    words = normalize_text(name).split(' ')
+    while len(words) > 1 and words[0] in _ARTICLES:
+        words.pop(0)
+    return ' '.join(words)
+
+def load_countries(path=COUNTRIES_CSV):
+    # Maps the normalized French and English names of each country to (ISO-3166 alpha-2 code, capital or None)
+    countries = {}
+    with open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line_list = line.rstrip('\n').split("\t")
+            if len(line_list) < 3:
+                continue
+            capital = None
+            if len(line_list) >= 6 and len(line_list[5].strip()) > 0:
+                capital = line_list[5].lower().strip()
+            value = (line_list[2].lower().strip(), capital)
+            for name in (line_list[1], line_list[0]):
+                if len(name.strip()) > 0:
+                    countries.setdefault(country_name_key(name), value)
+    return countries
+
+COUNTRIES = load_countries()
+
+def find_country(name):
+    # Returns (ISO-3166 alpha-2 code, capital or None) of a French or English country name, None if unknown
+    return COUNTRIES.get(country_name_key(name))
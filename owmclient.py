@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import random
+import threading
+import time
+
+API_URL = "https://api.openweathermap.org/data/2.5"
+CONNECT_TIMEOUT = 3.0
+READ_TIMEOUT = 5.0
+RETRIES = 2
+BACKOFF = 0.5
+POOL_SIZE = 8
+
+# requests takes about 100 ms to import, it is only loaded with the first session so that
+# the skill subscribes to its intents first (see warm_up)
+requests = None
+# Seconds to hold off after a 429 answer without Retry-After, the free plan counts calls per minute
+RATE_LIMITED_BACKOFF = 60
+
+class RateLimited(Exception):
+    # The API key is out of calls for now
+    pass
+
+class OWMClient(object):
+    # HTTP client for OpenWeatherMap keeping its connections alive between requests.
+    # Connection errors, timeouts and 5xx answers are retried with a jittered exponential backoff.
+    # Every attempt, retries included, takes a call from limiter (a ratelimit.TokenBucket) when one is set.
+    def __init__(self, api_url=API_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, retries=RETRIES, backoff=BACKOFF, limiter=None):
+        self.api_url = api_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter
+        self._session = None
+        self._lock = threading.Lock()
+
+    def configure(self, conf):
+        # conf is the [global] section of config.ini, missing values keep their defaults
+        self.api_url = conf.get('owm_api_url') or self.api_url
+        self.connect_timeout = float(conf.get('http_connect_timeout', self.connect_timeout))
+        self.read_timeout = float(conf.get('http_read_timeout', self.read_timeout))
+        self.retries = int(conf.get('http_retries', self.retries))
+        self.backoff = float(conf.get('http_backoff', self.backoff))
+
+    @property
+    def session(self):
+        global requests
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def warm_up(self):
+        # Creates the session ahead of the first request, meant to run in the background after startup
+        return self.session
+
+    def get(self, path, params, interactive=True):
+        # Returns the last response received, or None if the API could not be reached at all.
+        # Raises RateLimited when the limiter has no call left for an attempt or OpenWeatherMap answers 429,
+        # interactive tells the limiter whether someone is waiting for the answer
+        session = self.session
+        url = "%s/%s" % (self.api_url.rstrip('/'), path)
+        response = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            if self.limiter is not None and not self.limiter.acquire(interactive):
+                raise RateLimited("no API call left")
+            try:
+                response = session.get(url, params=params, timeout=(self.connect_timeout, self.read_timeout))
+            except (requests.ConnectionError, requests.Timeout):
+                response = None
+                continue
+            if response.status_code == 429:
+                if self.limiter is not None:
+                    try:
+                        backoff = float(response.headers.get('Retry-After', RATE_LIMITED_BACKOFF))
+                    except ValueError:
+                        backoff = RATE_LIMITED_BACKOFF
+                    self.limiter.back_off(backoff)
+                raise RateLimited("API calls limit reached")
+            if response.status_code < 500:
+                break
+        return response
+
+client = OWMClient()
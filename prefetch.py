@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import weather as wt
+from locations import location_key
+
+INTERVAL = 60
+# Shortest sleep between two cycles, when locations are still due after a cycle
+MIN_WAIT = 5
+TOP = 5
+MAX_PER_CYCLE = 2
+CONCURRENCY = 1
+
+class Prefetcher(threading.Thread):
+    # Keeps the default location and the most requested ones warm by refreshing them as soon as
+    # they expire. Expiries are aligned on the provider's updates (see weather.forecast_expiry), a
+    # refresh before them would only fetch the forecast about to be replaced again. The scheduler
+    # wakes up at the earliest expiry, or every interval seconds at most. At most max_per_cycle
+    # refreshes run per cycle, concurrency of them at a time, to stay inside the API quota. A location
+    # whose refresh failed (upstream down, out of calls) is not tried again before interval seconds.
+    def __init__(self, api_key, default_location=None, interval=INTERVAL, top=TOP, max_per_cycle=MAX_PER_CYCLE, concurrency=CONCURRENCY):
+        threading.Thread.__init__(self, name="prefetch", daemon=True)
+        self.api_key = api_key
+        self.default_location = default_location
+        self.interval = interval
+        self.top = top
+        self.max_per_cycle = max_per_cycle
+        self.concurrency = concurrency
+        self._stopped = threading.Event()
+        # location key -> timestamp before which a location that failed to refresh is not tried again
+        self._retry_at = {}
+
+    def locations(self):
+        candidates = wt.popular_locations(self.top)
+        if self.default_location is not None:
+            candidates.insert(0, self.default_location)
+        locations = OrderedDict()
+        for locality, country in candidates:
+            locations.setdefault(location_key(locality, country), (locality, country))
+        return list(locations.values())
+
+    def _due_at(self, locality, country):
+        # Timestamp at which a location should be refreshed: its expiry, or the next retry after a failure
+        retry_at = self._retry_at.get(location_key(locality, country), 0)
+        expires = wt.expiry(locality, country)
+        if expires is None:
+            return retry_at
+        return max(expires, retry_at)
+
+    def cycle(self):
+        # Returns how many locations were fetched again
+        now = time.time()
+        locations = self.locations()
+        keys = set(location_key(locality, country) for locality, country in locations)
+        for key in list(self._retry_at):
+            if key not in keys or self._retry_at[key] <= now:
+                del self._retry_at[key]
+        due = [location for location in locations if self._due_at(*location) <= now]
+        due = due[:self.max_per_cycle]
+        if len(due) == 0:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(lambda location: wt.refresh(location[0], location[1], self.api_key), due))
+        now = time.time()
+        for (locality, country), fetched in zip(due, results):
+            expires = wt.expiry(locality, country)
+            if not fetched and (expires is None or expires <= now):
+                self._retry_at[location_key(locality, country)] = now + self.interval
+        return sum(1 for fetched in results if fetched)
+
+    def next_wait(self):
+        # Seconds until the earliest expiry or retry of the locations, within [MIN_WAIT, interval]
+        now = time.time()
+        wait = self.interval
+        for locality, country in self.locations():
+            wait = min(wait, self._due_at(locality, country) - now)
+        return max(wait, min(MIN_WAIT, self.interval))
+
+    def run(self):
+        while not self._stopped.wait(self.next_wait()):
+            try:
+                self.cycle()
+            except Exception:
+                pass # Never let a failed refresh stop the scheduler, callers fetch by themselves
+
+    def stop(self):
+        self._stopped.set()
+
+def start(conf):
+    # Starts the prefetcher described in config.ini, returns None when it is disabled
+    wt.configure(conf)
+    settings = conf.get('global', {})
+    secret = conf.get('secret', {})
+    if settings.get('prefetch', '0').strip().lower() not in ('1', 'yes', 'true', 'on') or not secret.get('api_key'):
+        return None
+    default_location = None
+    if secret.get('default_location') and secret.get('default_countrycode'):
+        default_location = (secret['default_location'], secret['default_countrycode'])
+    prefetcher = Prefetcher(secret['api_key'], default_location,
+                            interval=float(settings.get('prefetch_interval_seconds', INTERVAL)),
+                            top=int(settings.get('prefetch_top', TOP)),
+                            max_per_cycle=int(settings.get('prefetch_max_per_cycle', MAX_PER_CYCLE)),
+                            concurrency=int(settings.get('prefetch_concurrency', CONCURRENCY)))
+    prefetcher.start()
+    return prefetcher
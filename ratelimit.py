@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import fcntl
+import os
+import struct
+import threading
+import time
+
+# The free OpenWeatherMap plan allows 60 calls per minute and per API key
+CALLS_PER_MINUTE = 60
+BURST = 10
+# Tokens only interactive requests may take, background refreshes leave them alone
+RESERVE = 3
+# How long an interactive request may wait for a token
+MAX_WAIT = 1.0
+
+# State file layout: available tokens (negative while OpenWeatherMap asks to back off), last update timestamp
+STATE = struct.Struct('<dd')
+
+class TokenBucket(object):
+    # Rate limiter shared by every process using the same state file: the bucket is read, refilled
+    # and written back under an exclusive flock, threads of a process also go through a lock as
+    # flock does not exclude them from each other
+    def __init__(self, path, calls_per_minute=CALLS_PER_MINUTE, burst=BURST, reserve=RESERVE, max_wait=MAX_WAIT):
+        self.path = path
+        self.calls_per_minute = calls_per_minute
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def configure(self, conf):
+        # conf is the [global] section of config.ini, missing values keep their defaults
+        self.calls_per_minute = float(conf.get('api_calls_per_minute', self.calls_per_minute))
+        self.burst = float(conf.get('api_burst', self.burst))
+        self.reserve = float(conf.get('api_interactive_reserve', self.reserve))
+        self.max_wait = float(conf.get('api_max_wait_seconds', self.max_wait))
+
+    def _update(self, change):
+        # Refills the bucket and applies change(tokens) -> (new tokens, result) atomically, returns result
+        with self._lock:
+            if self._fd is None:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                data = os.pread(self._fd, STATE.size, 0)
+                if len(data) == STATE.size:
+                    tokens, updated = STATE.unpack(data)
+                    tokens = min(self.burst, tokens + max(0, now - updated) * self.calls_per_minute / 60)
+                else:
+                    tokens = self.burst
+                tokens, result = change(tokens)
+                os.pwrite(self._fd, STATE.pack(tokens, now), 0)
+                return result
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _take(self, floor):
+        # Takes a token if one is left above floor, otherwise returns how long to wait for one
+        def change(tokens):
+            if tokens - 1 >= floor:
+                return tokens - 1, 0
+            return tokens, (floor + 1 - tokens) * 60 / self.calls_per_minute
+        return self._update(change)
+
+    def acquire(self, interactive=True):
+        # Returns whether a request may be sent now. Interactive requests may use the reserve and
+        # wait up to max_wait for a token, background ones only take what is above the reserve
+        if self.calls_per_minute <= 0:
+            return True
+        deadline = time.monotonic() + (self.max_wait if interactive else 0)
+        while True:
+            wait = self._take(0 if interactive else self.reserve)
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def back_off(self, seconds):
+        # Empties the bucket for at least `seconds`, when OpenWeatherMap answers 429
+        if self.calls_per_minute > 0:
+            self._update(lambda tokens: (min(tokens, -seconds * self.calls_per_minute / 60), None))
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+SLOTS = 64
+# Largest payload an entry holds, a 5 days/3 hours forecast takes about 1.2 kB in the binary layout
+CAPACITY = 4096
+# Attempts of a reader racing with writers before giving up and going to the disk cache
+READ_ATTEMPTS = 16
+
+# File header: magic, version, slot count, entry capacity, padded to HEADER_SIZE
+HEADER = struct.Struct('<4sHHI')
+HEADER_SIZE = 64
+MAGIC = b'OWMS'
+VERSION = 1
+# Entry header: sequence number, fetched and expiry timestamps, key length, payload length, key.
+# The payload follows at ENTRY_HEADER_SIZE
+ENTRY = struct.Struct('<QddHI96s')
+SEQUENCE = struct.Struct('<Q')
+ENTRY_HEADER_SIZE = 128
+MAX_KEY_LENGTH = 96
+
+class SharedForecasts(object):
+    # Forecast payloads kept in a file mapped in memory by every process using the cache, so that a
+    # forecast fetched by one of them is read by the others without opening or querying the disk cache.
+    # Keys are hashed to a fixed number of entries, a newer key takes over the entry of an older one.
+    # Each entry is guarded by a sequence number (seqlock): writers, serialized by a flock, make it odd
+    # while they write and even again once done, readers retry when it is odd or changed during their read
+    def __init__(self, path, slots=SLOTS, capacity=CAPACITY):
+        self.path = path
+        self.slots = slots
+        self.capacity = capacity
+        self.entry_size = ENTRY_HEADER_SIZE + capacity
+        self._fd = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        with self._lock:
+            if self._map is None:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                size = HEADER_SIZE + self.slots * self.entry_size
+                header = HEADER.pack(MAGIC, VERSION, self.slots, self.capacity)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size != size or os.pread(fd, HEADER.size, 0) != header:
+                        # New file or another layout: start over from zeroed entries
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, size)
+                        os.pwrite(fd, header, 0)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                self._fd = fd
+                self._map = mmap.mmap(fd, size)
+            return self._map
+
+    def _offset(self, key):
+        return HEADER_SIZE + zlib.crc32(key) % self.slots * self.entry_size
+
+    def get(self, key):
+        # Returns (fetched timestamp, expiry timestamp, payload) or None
+        key = key.encode('utf-8')
+        if len(key) > MAX_KEY_LENGTH:
+            return None
+        buf = self._open()
+        offset = self._offset(key)
+        for attempt in range(READ_ATTEMPTS):
+            sequence, fetched, expires, key_length, length, entry_key = ENTRY.unpack_from(buf, offset)
+            if sequence & 1:
+                continue
+            found = entry_key[:key_length] == key and length <= self.capacity
+            if found:
+                start = offset + ENTRY_HEADER_SIZE
+                payload = buf[start:start + length]
+            if SEQUENCE.unpack_from(buf, offset)[0] == sequence:
+                return (fetched, expires, payload) if found else None
+        return None
+
+    def put(self, key, fetched, expires, payload):
+        # Returns False if the key or the payload does not fit in an entry
+        key = key.encode('utf-8')
+        if len(key) > MAX_KEY_LENGTH or len(payload) > self.capacity:
+            return False
+        buf = self._open()
+        offset = self._offset(key)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # A writer killed in the middle of a write leaves the sequence odd, it stays odd until this write is done
+                sequence = SEQUENCE.unpack_from(buf, offset)[0] | 1
+                SEQUENCE.pack_into(buf, offset, sequence)
+                start = offset + ENTRY_HEADER_SIZE
+                buf[start:start + len(payload)] = payload
+                ENTRY.pack_into(buf, offset, sequence, fetched, expires, len(key), len(payload), key)
+                SEQUENCE.pack_into(buf, offset, sequence + 1)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+                self._map = None
+                self._fd = None
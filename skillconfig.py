@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import configparser
+import io
+import os
+import threading
+
+CONFIGURATION_ENCODING_FORMAT = "utf-8"
+CONFIG_INI = "config.ini"
+
+class SnipsConfigParser(configparser.ConfigParser):
+    def to_dict(self):
+        return {section : {option_name : option for option_name, option in self.items(section)} for section in self.sections()}
+
+
+def parse_configuration_file(configuration_file):
+    try:
+        with io.open(configuration_file, encoding=CONFIGURATION_ENCODING_FORMAT) as f:
+            conf_parser = SnipsConfigParser()
+            conf_parser.read_file(f)
+            return conf_parser.to_dict()
+    except (IOError, configparser.Error) as e:
+        return dict()
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def read_configuration_file(configuration_file=CONFIG_INI):
+    # Parsed configuration, only read again when the file's mtime or size changed.
+    # The returned dict is shared between callers and must not be modified
+    try:
+        st = os.stat(configuration_file)
+        signature = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        signature = None
+    with _cache_lock:
+        cached = _cache.get(configuration_file)
+        if cached is not None and cached[0] == signature and signature is not None:
+            return cached[1]
+    conf = parse_configuration_file(configuration_file)
+    with _cache_lock:
+        _cache[configuration_file] = (signature, conf)
+    return conf
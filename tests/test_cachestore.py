@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from cachestore import CacheStore
+
+class CacheStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = CacheStore(os.path.join(self.directory, "cache.db"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_put_replaces(self):
+        self.store.put("paris_fr", 1, 2, b"a" * 100)
+        self.store.put("paris_fr", 3, 4, b"b" * 50)
+        self.assertEqual(self.store.get("paris_fr"), (3, 4, b"b" * 50))
+
+    def test_totals_follow_the_rows(self):
+        self.store.put("paris_fr", 1, 2, b"a" * 100)
+        self.store.put("paris_fr", 1, 2, b"b" * 50)
+        self.store.put("lyon_fr", 1, 2, b"c" * 10)
+        conn = self.store._connect()
+        rows = conn.execute("SELECT COUNT(*), SUM(size), SUM(raw_size) FROM forecasts").fetchone()
+        stats = self.store.stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['raw_bytes']), rows)
+        self.assertEqual(stats['raw_bytes'], 60)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import json
+import unittest
+from forecast import ForecastSeries, parse_response
+
+def response(slots, **fields):
+    body = {'cod': "200", 'cnt': len(slots), 'list': [{
+        'dt': dt,
+        'main': {'temp': temp, 'pressure': 1016, 'humidity': 71},
+        'weather': [{'id': condition_id, 'main': "Rain", 'description': "light rain", 'icon': "10d"}],
+        'wind': {'speed': 4.1, 'deg': 240},
+        'sys': {'pod': "d"},
+    } for dt, temp, condition_id in slots], 'city': {'id': 2988507, 'name': "Paris", 'coord': {'lat': 48.85, 'lon': 2.35}}}
+    body.update(fields)
+    return body
+
+class ParseResponseTest(unittest.TestCase):
+    def test_compact_and_pretty_printed(self):
+        body = response([(10800, 283.15, 500), (21600, 284.15, 800)])
+        for text in (json.dumps(body, separators=(',', ':')), json.dumps(body, indent=4)):
+            series = parse_response(text)
+            self.assertEqual(series.cod, "200")
+            self.assertEqual(list(series.dt), [10800, 21600])
+            self.assertEqual(list(series.temp), [283.15, 284.15])
+            self.assertEqual(series.conditions[1], (800,))
+            self.assertEqual(series.city, (2988507, 48.85, 2.35))
+
+    def test_slots_are_sorted(self):
+        series = parse_response(json.dumps(response([(21600, 284.15, 800), (10800, 283.15, 500)])))
+        self.assertEqual(list(series.dt), [10800, 21600])
+        self.assertEqual(series.conditions[0], (500,))
+
+    def test_unknown_city(self):
+        series = parse_response('{"cod": "404", "message": "city not found"}')
+        self.assertEqual(series.cod, "404")
+        self.assertEqual(len(series), 0)
+        self.assertIsNone(series.city)
+
+    def test_malformed(self):
+        text = json.dumps(response([(10800, 283.15, 500)]))
+        for malformed in (text[:len(text) // 2], "", "[1, 2]", '{"cod": "200", "list": [{"dt": 10800}]}'):
+            with self.assertRaises((ValueError, KeyError, TypeError)):
+                parse_response(malformed)
+
+class BinaryLayoutTest(unittest.TestCase):
+    def test_round_trip(self):
+        series = ForecastSeries("200", [10800, 21600], [283.15, 284.15], [4.1, 0.0], [[500, 701], [800]])
+        decoded = ForecastSeries.from_buffer(series.to_bytes())
+        self.assertEqual(list(decoded.dt), [10800, 21600])
+        self.assertEqual(list(decoded.wind), [4.1, 0.0])
+        self.assertEqual([decoded.conditions[i] for i in range(2)], [(500, 701), (800,)])
+
+    def test_truncated_payload(self):
+        payload = ForecastSeries("200", [10800], [283.15], [4.1], [[500]]).to_bytes()
+        self.assertIsNone(ForecastSeries.from_buffer(payload[:-1]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import sharedcache
+from sharedcache import SharedForecasts
+
+class ArmedStruct(object):
+    # Stands for a struct of sharedcache, runs action once right after the next unpack_from: what a
+    # writer of another process could do between two reads of the reader
+    def __init__(self, struct, action):
+        self.struct = struct
+        self.action = action
+        self.size = struct.size
+
+    def unpack_from(self, buf, offset=0):
+        result = self.struct.unpack_from(buf, offset)
+        action, self.action = self.action, None
+        if action is not None:
+            action()
+        return result
+
+    def pack_into(self, buf, offset, *values):
+        return self.struct.pack_into(buf, offset, *values)
+
+def write_entries(path, count):
+    cache = SharedForecasts(path)
+    for i in range(count):
+        cache.put("paris_fr", i, i, bytes([i % 251]) * (100 + i % 3000))
+
+def read_entries(path, duration, results):
+    # Counts the entries read whole and the torn ones, whose payload does not match their header
+    cache = SharedForecasts(path)
+    whole = torn = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        entry = cache.get("paris_fr")
+        if entry is None:
+            continue
+        fetched, expires, payload = entry
+        if payload == bytes([int(fetched) % 251]) * (100 + int(fetched) % 3000):
+            whole += 1
+        else:
+            torn += 1
+    results.put((whole, torn))
+
+class SharedForecastsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "forecasts.shm")
+        self.cache = SharedForecasts(self.path)
+        self.offset = self.cache._offset(b"paris_fr")
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def sequence(self):
+        return sharedcache.SEQUENCE.unpack_from(self.cache._open(), self.offset)[0]
+
+    def set_sequence(self, sequence):
+        sharedcache.SEQUENCE.pack_into(self.cache._open(), self.offset, sequence)
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get("paris_fr"))
+        self.assertTrue(self.cache.put("paris_fr", 1.0, 2.0, b"payload"))
+        self.assertEqual(self.cache.get("paris_fr"), (1.0, 2.0, b"payload"))
+        self.assertEqual(self.sequence() % 2, 0)
+        self.assertIsNone(self.cache.get("lyon_fr"))
+        self.assertFalse(self.cache.put("paris_fr", 1.0, 2.0, b"x" * (sharedcache.CAPACITY + 1)))
+
+    def test_odd_sequence_is_retried(self):
+        # A write in progress during the first attempt, done for the second one
+        self.cache.put("paris_fr", 1.0, 2.0, b"payload")
+        sequence = self.sequence()
+        self.set_sequence(sequence + 1)
+        original = sharedcache.ENTRY
+        sharedcache.ENTRY = ArmedStruct(original, lambda: self.set_sequence(sequence + 2))
+        try:
+            self.assertEqual(self.cache.get("paris_fr"), (1.0, 2.0, b"payload"))
+        finally:
+            sharedcache.ENTRY = original
+
+    def test_changed_sequence_is_retried(self):
+        # Another process rewrites the entry between the reads of the header and of the sequence:
+        # the payload read may be torn, the second attempt sees the new entry whole
+        self.cache.put("paris_fr", 1.0, 2.0, b"old payload")
+        writer = SharedForecasts(self.path)
+        original = sharedcache.ENTRY
+        sharedcache.ENTRY = ArmedStruct(original, lambda: writer.put("paris_fr", 3.0, 4.0, b"new payload"))
+        try:
+            self.assertEqual(self.cache.get("paris_fr"), (3.0, 4.0, b"new payload"))
+        finally:
+            sharedcache.ENTRY = original
+            writer.close()
+
+    def test_crashed_writer(self):
+        # A writer killed in the middle of a write leaves the sequence odd: readers give up and go to
+        # the disk cache until the next write of the entry
+        self.cache.put("paris_fr", 1.0, 2.0, b"payload")
+        self.set_sequence(self.sequence() + 1)
+        self.assertIsNone(self.cache.get("paris_fr"))
+        self.cache.put("paris_fr", 3.0, 4.0, b"new payload")
+        self.assertEqual(self.sequence() % 2, 0)
+        self.assertEqual(self.cache.get("paris_fr"), (3.0, 4.0, b"new payload"))
+
+    def test_concurrent_processes(self):
+        self.cache.put("paris_fr", 0, 0, bytes([0]) * 100)
+        results = multiprocessing.Queue()
+        readers = [multiprocessing.Process(target=read_entries, args=(self.path, 1.0, results)) for i in range(2)]
+        writers = [multiprocessing.Process(target=write_entries, args=(self.path, 20000)) for i in range(2)]
+        for process in readers + writers:
+            process.start()
+        counts = [results.get(timeout=30) for process in readers]
+        for process in readers + writers:
+            process.join()
+        self.assertTrue(all(whole > 0 for whole, torn in counts))
+        self.assertEqual([torn for whole, torn in counts], [0, 0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Slot values of the intents mapped once to what they mean, so that answering is a dict lookup.
+# Keys are normalized with normalize_text, so case and accents of the slot values don't matter
+
+from conditioncodes import CONDITION_CODES
+from locations import normalize_text
+
+# Item kinds of the searchWeatherForecastItem intent
+SUN_GEAR = "sun"
+SUMMER_CLOTHES = "summer"
+COLD_GEAR = "cold"
+RAIN_GEAR = "rain"
+
+# Temperature kinds of the searchWeatherForecastTemperature intent
+COLDER = "colder"
+WARMER = "warmer"
+HOT = "hot"
+COLD = "cold"
+
+# Condition codes the items are checked against
+SUNNY_CODES = frozenset([800, 801])
+RAIN_CODES = frozenset([300, 301, 302, 310, 311, 312, 313, 314, 321, 500, 501, 502, 503, 504, 511, 521, 522, 531, 615, 616])
+THUNDERSTORM_CODES = frozenset([200, 201, 202, 210, 211, 212, 221, 230, 231, 232])
+
+def build_index(groups):
+    # {kind: [slot values]} -> {normalized slot value: kind}, a value can only have one kind
+    index = {}
+    for kind, values in groups.items():
+        for value in values:
+            key = normalize_text(value)
+            if index.get(key, kind) != kind:
+                raise ValueError("%r is both %s and %s" % (value, index[key], kind))
+            index[key] = kind
+    return index
+
+def build_condition_words(condition_codes):
+    # Normalized condition word -> set of the condition codes it describes
+    words = {}
+    for code, condition in condition_codes.items():
+        for word in condition['snips']:
+            words.setdefault(normalize_text(word), set()).add(code)
+    return {word: frozenset(codes) for word, codes in words.items()}
+
+ITEMS = build_index({
+    SUN_GEAR: ['chapeau', 'couvre-chef', 'casquette', 'turban', 'chapeau chinois', 'créme bronzante', 'crème solaire', 'lunettes de soleil', 'ombrelle', 'chapeau de paille'],
+    SUMMER_CLOTHES: ['éventail', 'robe sans manche', 'short', 'jupe', 'nuds-pieds', 'espadrilles', 'tongues', 'vêtements légers'],
+    COLD_GEAR: ['bonneterie', 'écharpe', 'bonnet', 'cagoule', 'bottes fourrées', 'manteau', 'pull', 'doudoune', 'gros pull', 'bas de laine', 'chaussettes de laine', 'chaussettes en laine', 'chaussettes chaudes', 'pull chaud', 'mouffles'],
+    RAIN_GEAR: ['parapluie', 'capuche', 'imperméable', 'imper', 'k way'],
+})
+
+TEMPERATURE_NAMES = build_index({
+    COLDER: ['refroidir', 'plus froid'],
+    WARMER: ['réchauffer'],
+    HOT: ['estivale', 'bouillant', 'lourd', 'étouffant', 'chaud'],
+    COLD: ['froid de canard', 'frisquet', 'frais', 'froid', 'glacial'],
+})
+
+CONDITION_WORDS = build_condition_words(CONDITION_CODES)
+
+def item_kind(item):
+    if item is None:
+        return None
+    return ITEMS.get(normalize_text(item))
+
+def temperature_kind(temperature_name):
+    if temperature_name is None:
+        return None
+    return TEMPERATURE_NAMES.get(normalize_text(temperature_name))
+
+def condition_codes(condition_name):
+    # Condition codes matching a forecast_condition_name slot value, empty if unknown
+    if condition_name is None:
+        return frozenset()
+    return CONDITION_WORDS.get(normalize_text(condition_name), frozenset())
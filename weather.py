@@ -1,35 +1,387 @@
 #!/usr/bin/env python3
 
-import os
-import json
-import re
 import datetime
-import requests
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from cachestore import CacheStore
+from forecast import ForecastSeries, parse_response
+from locations import location_key
+from owmclient import RateLimited, client
+from ratelimit import TokenBucket
+from sharedcache import SharedForecasts
+
+# A forecast is kept until OpenWeatherMap publishes the next one, within these bounds.
+# Both are set from config.ini by configure()
+MIN_TTL = datetime.timedelta(minutes=10)
+MAX_TTL = datetime.timedelta(hours=3)
+# The 5 days/3 hours forecast is recomputed every 3 hours, aligned on its slots
+PROVIDER_UPDATE_INTERVAL = 10800
+# Expired forecasts may still be answered right away while a refresh runs in the background,
+# up to MAX_STALE past their expiry. Both are set from config.ini by configure()
+SERVE_STALE = False
+MAX_STALE = datetime.timedelta(hours=1)
+# Locations are fetched by OpenWeatherMap city id once resolved, the resolution is kept RESOLVE_TTL.
+# Names OpenWeatherMap does not know are not asked for again before UNKNOWN_TTL.
+# Both are set from config.ini by configure()
+RESOLVE_TTL = datetime.timedelta(days=30)
+UNKNOWN_TTL = datetime.timedelta(hours=24)
+MEMORY_CACHE_SIZE = 64
+# Stale entries are dropped from the disk cache at most once per interval
+EVICTION_INTERVAL = 60
+# Locations fetched at the same time by get_weather_data_many
+BATCH_CONCURRENCY = 8
+
+class WeatherError(Exception):
+    pass
+
+class LocationNotFound(WeatherError):
+    # OpenWeatherMap does not know the location
+    pass
+
+
+class ForecastCache(object):
+    # Bounded in-process cache of already parsed forecasts.
+    # Entries expire at a given timestamp and are kept `grace` seconds longer to be served stale,
+    # the least recently used one is dropped when full.
+    def __init__(self, maxsize=MEMORY_CACHE_SIZE, grace=0):
+        self.maxsize = maxsize
+        self.grace = grace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        # Returns (value, expires) or None, expires is in the past for a stale entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires + self.grace <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value, expires
+
+    def put(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class SingleFlight(object):
+    # Coalesces concurrent calls for the same key: the first caller runs the function,
+    # the ones arriving while it runs wait for its result instead of running it again.
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        # Returns (result, coalesced), coalesced being True when the result came from another caller
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+        try:
+            call['result'] = fn(*args)
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        return call['result'], False
+
+memory_cache = ForecastCache(grace=MAX_STALE.total_seconds())
+inflight = SingleFlight()
+store = CacheStore()
+# The forecasts last fetched by any process, mapped in memory ahead of the disk cache
+shared = SharedForecasts(os.path.join(os.path.dirname(store.path), "forecasts.shm"))
+# Calls left to the API key, shared with the other processes using the cache. Every attempt of the client takes one
+limiter = TokenBucket(os.path.join(os.path.dirname(store.path), "ratelimit.state"))
+client.limiter = limiter
+_last_eviction = 0
+_eviction_lock = threading.Lock()
+# Lookup counters: "memory" hits, "disk" hits (shared memory or SQLite), "miss" for the lookups that went upstream,
+# "coalesced" for the ones that waited on another caller's lookup, "stale" for the answers given from expired forecasts,
+# "unknown" for the names answered from the unknown locations without going upstream,
+# "throttled" for the fetches the rate limiter or a 429 answer prevented
+stats = Counter()
+# How often each location was asked for, the prefetcher keeps the most popular ones warm
+popularity = Counter()
+_popular_names = {}
+_popularity_lock = threading.Lock()
+POPULARITY_SIZE = 256
+
+def configure(conf):
+    # Applies the [global] settings of config.ini
+    global MIN_TTL, MAX_TTL, SERVE_STALE, MAX_STALE, RESOLVE_TTL, UNKNOWN_TTL
+    conf = conf.get('global', {})
+    client.configure(conf)
+    limiter.configure(conf)
+    store.configure(conf)
+    MIN_TTL = datetime.timedelta(minutes=float(conf.get('cache_ttl_min_minutes', MIN_TTL.total_seconds() / 60)))
+    MAX_TTL = datetime.timedelta(minutes=float(conf.get('cache_ttl_max_minutes', MAX_TTL.total_seconds() / 60)))
+    SERVE_STALE = conf.get('serve_stale', '0').strip().lower() in ('1', 'yes', 'true', 'on')
+    MAX_STALE = datetime.timedelta(minutes=float(conf.get('max_stale_minutes', MAX_STALE.total_seconds() / 60)))
+    RESOLVE_TTL = datetime.timedelta(days=float(conf.get('resolve_ttl_days', RESOLVE_TTL.total_seconds() / 86400)))
+    UNKNOWN_TTL = datetime.timedelta(hours=float(conf.get('unknown_location_ttl_hours', UNKNOWN_TTL.total_seconds() / 3600)))
+    memory_cache.grace = MAX_STALE.total_seconds()
+
+def cache_stats():
+    # Lookup counters of this process, along with the state of the disk cache as disk_entries, disk_bytes,
+    # disk_raw_bytes, disk_compression_ratio, disk_file_bytes and disk_evicted
+    result = dict(stats)
+    for name, value in store.stats().items():
+        result['disk_' + name] = value
+    return result
+
+def evict_expired():
+    # Eviction pass over the disk cache, run apart from lookups
+    global _last_eviction
+    with _eviction_lock:
+        now = time.time()
+        if now - _last_eviction < EVICTION_INTERVAL:
+            return 0
+        _last_eviction = now
+    return store.evict(now - MAX_STALE.total_seconds())
+
+def forecast_expiry(weather, fetched):
+    # The forecast slots start on the provider's update grid, so the next update is the first
+    # grid point after the fetch: nothing newer can be fetched before then
+    if weather.cod == "404":
+        return fetched + UNKNOWN_TTL.total_seconds()
+    expires = fetched + MIN_TTL.total_seconds()
+    if weather.cod == "200" and len(weather) > 0:
+        phase = weather.dt[0] % PROVIDER_UPDATE_INTERVAL
+        next_update = fetched - (fetched - phase) % PROVIDER_UPDATE_INTERVAL + PROVIDER_UPDATE_INTERVAL
+        expires = min(max(next_update, expires), fetched + MAX_TTL.total_seconds())
+    return expires
+
+def popular_locations(n):
+    # The n most requested (locality, country) pairs
+    with _popularity_lock:
+        return [_popular_names[key] for key, count in popularity.most_common(n)]
+
+def _record_request(key, locality, country):
+    with _popularity_lock:
+        popularity[key] += 1
+        _popular_names[key] = (locality, country)
+        if len(popularity) > POPULARITY_SIZE:
+            kept = dict(popularity.most_common(POPULARITY_SIZE // 2))
+            popularity.clear()
+            popularity.update(kept)
+            for name_key in list(_popular_names):
+                if name_key not in kept:
+                    del _popular_names[name_key]
 
 def get_weather_data(locality, country, api_key):
-    weather = None
-    if not os.path.isdir("cache"):
-        os.mkdir('cache')
-    regex = re.compile(r'^(?P<time>[0-9]+)_(?P<city>[\w-]+)_(?P<country>[A-Za-z ]{2})\.json$')
-    for f in os.listdir('cache'):
-        file_attrs = re.match(regex, f)
-        if file_attrs is not None:
-            dtime = datetime.datetime.fromtimestamp(float(file_attrs.group('time')))
-            if dtime < datetime.datetime.now() - datetime.timedelta(minutes=10):
-                os.unlink(os.path.join('cache', f))
-            elif file_attrs.group('city') == locality and file_attrs.group('country') == country:
-                new_f = open(os.path.join('cache', f), 'rt')
-                weather = json.loads(new_f.read())
-                new_f.close()
-    if weather is None:
-        r = requests.get("https://api.openweathermap.org/data/2.5/forecast?q=%s,%s&APPID=%s" % (locality, country, api_key))
-        weather = r.json()
-        if weather['cod'] != "200" and weather['cod'] != "404":
-            return None
-        weather_txt = json.dumps(weather)
-        timestamp = "%d_%s_%s.json" % (datetime.datetime.now().timestamp(), locality, country)
-        f = open(os.path.join('cache', timestamp), 'wt')
-        f.write(weather_txt)
-        f.close()
+    key = location_key(locality, country)
+    _record_request(key, locality, country)
+    entry = memory_cache.get(key)
+    if entry is not None:
+        weather, expires = entry
+        if expires > time.time():
+            stats['memory'] += 1
+            store.touch(key)
+            return weather
+        if SERVE_STALE:
+            stats['stale'] += 1
+            store.touch(key)
+            refresh_in_background(key, locality, country, api_key)
+            return weather
+    weather, coalesced = inflight.do(key, _load_weather_data, key, locality, country, api_key)
+    if coalesced:
+        stats['coalesced'] += 1
+    return weather
+
+def refresh_in_background(key, locality, country, api_key):
+    # Refreshes an expired entry without making the caller wait, at most one refresh per location at a time
+    def run():
+        try:
+            inflight.do(('refresh', key), _refresh_weather_data, key, locality, country, api_key)
+        except Exception:
+            pass # The stale entry keeps being served until MAX_STALE, then callers fetch themselves
+    threading.Thread(target=run, daemon=True).start()
+
+def _load_weather_data(key, locality, country, api_key):
+    evict_expired()
+    weather, expires = _read_store(key)
+    if weather is not None and expires <= time.time() and SERVE_STALE:
+        stats['stale'] += 1
+        memory_cache.put(key, weather, expires)
+        refresh_in_background(key, locality, country, api_key)
+        return weather
+    if weather is None or expires <= time.time():
+        with store.fetch_lock(key):
+            # Another process may have fetched it while we were waiting for the lock
+            weather, expires = _read_store(key)
+            if weather is None or expires <= time.time():
+                weather, expires = _fetch_weather_data(key, locality, country, api_key)
+            else:
+                stats['disk'] += 1
+    else:
+        stats['disk'] += 1
+    if weather is not None:
+        memory_cache.put(key, weather, expires)
+    return weather
+
+def expiry(locality, country):
+    # Expiry timestamp of the cached forecast of a location, None if it is not cached
+    key = location_key(locality, country)
+    entry = memory_cache.get(key)
+    if entry is not None:
+        return entry[1]
+    entry = shared.get(key) or store.get(key)
+    if entry is not None:
+        return entry[1]
+    return None
+
+def refresh(locality, country, api_key):
+    # Fetches the forecast again if it is missing or expired.
+    # Returns True when an upstream request was made
+    key = location_key(locality, country)
+    entry = memory_cache.get(key)
+    if entry is not None and entry[1] > time.time():
+        return False
+    fetched, coalesced = inflight.do(('refresh', key), _refresh_weather_data, key, locality, country, api_key)
+    return fetched and not coalesced
+
+def _refresh_weather_data(key, locality, country, api_key):
+    fetched = False
+    with store.fetch_lock(key):
+        # Another process may just have refreshed it
+        weather, expires = _read_store(key)
+        if weather is None or expires <= time.time():
+            weather, expires = _fetch_weather_data(key, locality, country, api_key, interactive=False)
+            fetched = expires is not None and expires > time.time()
+    if weather is not None:
+        memory_cache.put(key, weather, expires)
+    return fetched
+
+def _read_store(key):
+    # Returns (weather, expires) for an entry that is still fresh or within MAX_STALE of its expiry,
+    # from the shared memory entries or else from the disk cache
+    entry = shared.get(key)
+    if entry is None:
+        entry = store.get(key)
+        if entry is not None:
+            shared.put(key, *entry)
+    else:
+        store.touch(key)
+    if entry is not None:
+        fetched, expires, payload = entry
+        if expires + MAX_STALE.total_seconds() > time.time():
+            weather = ForecastSeries.from_buffer(payload)
+            if weather is not None:
+                return weather, expires
+    return None, None
+
+def _write_store(key, fetched, expires, payload):
+    store.put(key, fetched, expires, payload)
+    shared.put(key, fetched, expires, payload)
+
+def _fetch_weather_data(key, locality, country, api_key, interactive=True):
+    # interactive is False for the refreshes nobody waits for, they leave the calls reserved to
+    # the intents to them. When the API key is out of calls the cached forecast is returned
+    # as long as it is within MAX_STALE of its expiry
+    now = time.time()
+    location = store.get_location(key)
+    if location is not None and location[3] <= now:
+        location = None
+    if location is not None and location[0] is None:
+        # OpenWeatherMap did not know this name recently, don't ask again before the entry expires
+        stats['unknown'] += 1
+        weather = ForecastSeries("404")
+        _write_store(key, now, location[3], weather.to_bytes())
+        return weather, location[3]
+    try:
+        if location is not None:
+            weather = _request_forecast({'id': location[0], 'APPID': api_key}, interactive)
+            if weather is None:
+                return None, None
+            if weather.cod == "404":
+                # The city id is not valid anymore, resolve the name again
+                store.delete_location(key)
+                location = None
+        if location is None:
+            weather = _request_forecast({'q': "%s,%s" % (locality, country), 'APPID': api_key}, interactive)
+            if weather is None:
+                return None, None
+            if weather.cod == "404":
+                store.put_location(key, None, None, None, time.time() + UNKNOWN_TTL.total_seconds())
+            elif weather.city is not None:
+                city_id, lat, lon = weather.city
+                store.put_location(key, city_id, lat, lon, time.time() + RESOLVE_TTL.total_seconds())
+    except RateLimited:
+        stats['throttled'] += 1
+        weather, expires = _read_store(key)
+        if interactive and weather is not None and expires <= time.time():
+            stats['stale'] += 1
+        return weather, expires
+    fetched = time.time()
+    expires = forecast_expiry(weather, fetched)
+    _write_store(key, fetched, expires, weather.to_bytes())
+    return weather, expires
+
+def _request_forecast(params, interactive=True):
+    # Returns the forecast answered for params, None if OpenWeatherMap could not answer.
+    # Raises RateLimited when no call is left or OpenWeatherMap answers 429
+    r = client.get("forecast", params, interactive)
+    stats['miss'] += 1
+    if r is None:
+        return None
+    try:
+        weather = parse_response(r.content.decode('utf-8'))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if weather.cod != "200" and weather.cod != "404":
+        return None
     return weather
 
+async def get_weather_data_async(locality, country, api_key, executor=None):
+    # Awaitable get_weather_data, sharing its caches, request coalescing and HTTP connections.
+    # asyncio is imported here and below, the intents never use it and it is slow to import
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, get_weather_data, locality, country, api_key)
+
+async def gather_weather_data(locations, api_key, concurrency=BATCH_CONCURRENCY):
+    # Fetches every (locality, country) of locations, at most `concurrency` at a time.
+    # Returns a dict mapping each location to its forecast or to the exception that prevented it,
+    # LocationNotFound for the ones OpenWeatherMap does not know
+    import asyncio
+    semaphore = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="weather") as executor:
+        async def fetch(location):
+            async with semaphore:
+                try:
+                    weather = await get_weather_data_async(location[0], location[1], api_key, executor)
+                except Exception as e:
+                    return location, e
+            if weather is None:
+                return location, WeatherError("could not fetch the forecast of %s, %s" % location)
+            if weather.cod == "404":
+                return location, LocationNotFound("unknown location %s, %s" % location)
+            return location, weather
+        results = await asyncio.gather(*[fetch(tuple(location)) for location in locations])
+    return dict(results)
+
+def get_weather_data_many(locations, api_key, concurrency=BATCH_CONCURRENCY):
+    # Blocking entry point for jobs refreshing many cities, not to be called from a running event loop
+    import asyncio
+    return asyncio.run(gather_weather_data(locations, api_key, concurrency))